@@ -6,81 +6,108 @@ Provides quick status overview and validates configuration
 
 import sys
 import os
+import sqlite3
+from functools import lru_cache
+import time
 from pathlib import Path
-import json
-from datetime import datetime
 
-def check_health():
-    """Perform health checks and display status"""
+from config_cache import load_config
+
+REQUIRED_KEYS = frozenset(['shopify_store_name', 'shopify_access_token', 'target_spreadsheet'])
+
+
+@lru_cache(maxsize=1)
+def _get_conn(db_file):
+    """Open the tracking database read-only once and reuse it for repeated checks"""
+    # mode=ro leaves the journal mode and file untouched and never takes the
+    # write lock, so the probe works while a sync is writing
+    conn = sqlite3.connect(f"{Path(db_file).absolute().as_uri()}?mode=ro", uri=True)
+    conn.execute('PRAGMA cache_size=-64000')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+
+def _quick_stats(db_file):
+    """Return (tracked order count, last successful sync timestamp)"""
+    conn = _get_conn(db_file)
+    return conn.execute('''
+        SELECT (SELECT COUNT(*) FROM order_tracking),
+               (SELECT MAX(sync_timestamp) FROM sync_history WHERE status = 'success')
+    ''').fetchone()
+
+
+def _run_checks(out):
+    """Perform health checks, reporting each result through out()"""
     
-    print("=== Shopify Sync Health Check ===")
-    print(f"Timestamp: {datetime.now()}")
-    print()
+    out("=== Shopify Sync Health Check ===")
+    now_ns = time.time_ns()
+    timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now_ns // 1_000_000_000))
+    out(f"Timestamp: {timestamp}.{now_ns % 1_000_000_000 // 1000:06d}")
+    out('')
     
     # Check configuration
-    if Path('config.json').exists():
-        print("✅ Configuration file found")
-        try:
-            with open('config.json', 'r') as f:
-                config = json.load(f)
-            
-            required_keys = ['shopify_store_name', 'shopify_access_token', 'target_spreadsheet']
-            missing = [key for key in required_keys if not config.get(key)]
-            
-            if missing:
-                print(f"❌ Missing config keys: {missing}")
-                return False
-            else:
-                print("✅ All required configuration keys present")
-                
-        except Exception as e:
-            print(f"❌ Error reading config: {e}")
-            return False
-    else:
-        print("❌ Configuration file missing")
+    try:
+        config = load_config()
+    except FileNotFoundError:
+        out("❌ Configuration file missing")
+        return False
+    except Exception as e:
+        out("✅ Configuration file found")
+        out(f"❌ Error reading config: {e}")
+        return False
+    
+    out("✅ Configuration file found")
+    missing = sorted(REQUIRED_KEYS - {key for key, value in config.items() if value})
+    
+    if missing:
+        out(f"❌ Missing config keys: {missing}")
         return False
+    else:
+        out("✅ All required configuration keys present")
     
     # Check service account file
     service_account_file = config.get('google_service_account_file', 'service_account.json')
-    if Path(service_account_file).exists():
-        print("✅ Google service account file found")
+    if Path(service_account_file).is_file():
+        out("✅ Google service account file found")
     else:
-        print(f"❌ Google service account file missing: {service_account_file}")
+        out(f"❌ Google service account file missing: {service_account_file}")
         return False
     
     # Check database
     db_file = config.get('db_path', 'shopify_sync.db')
     if Path(db_file).exists():
-        print("✅ Database file exists")
+        out("✅ Database file exists")
         
         # Quick database check
         try:
-            import sqlite3
-            conn = sqlite3.connect(db_file)
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM order_tracking')
-            count = cursor.fetchone()[0]
-            print(f"✅ Database contains {count} tracked orders")
+            count, last_sync = _quick_stats(db_file)
+            out(f"✅ Database contains {count} tracked orders")
             
             # Check recent sync
-            cursor.execute('SELECT MAX(sync_timestamp) FROM sync_history WHERE status = "success"')
-            last_sync = cursor.fetchone()[0]
             if last_sync:
-                print(f"✅ Last successful sync: {last_sync}")
+                out(f"✅ Last successful sync: {last_sync}")
             else:
-                print("⚠️  No successful sync history found")
-            
-            conn.close()
+                out("⚠️  No successful sync history found")
             
         except Exception as e:
-            print(f"⚠️  Database check failed: {e}")
+            out(f"⚠️  Database check failed: {e}")
     else:
-        print("⚠️  Database file not found (will be created on first run)")
+        out("⚠️  Database file not found (will be created on first run)")
     
-    print()
-    print("✅ Health check completed")
+    out('')
+    out("✅ Health check completed")
     return True
 
+def check_health():
+    """Perform health checks and display status"""
+    lines = []
+    try:
+        return _run_checks(lines.append)
+    finally:
+        # Emit the whole report with a single write, even if a check raised
+        sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
+
 if __name__ == "__main__":
     success = check_health()
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Shared configuration loaders for the helper scripts
+config.json and the service account key are parsed once per process and
+reused, so chained checks don't re-read the same files.
+Only the standard library is imported here so lightweight scripts such as
+check_health.py stay fast to start; Google clients live in sheets_client.py.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+
+try:
+    # orjson is an optional, faster drop-in for parsing; also used for
+    # Shopify API responses in shopify_sheets_sync
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+
+@lru_cache(maxsize=1)
+def load_config(config_file: str = 'config.json') -> dict:
+    """Load config.json (cached; callers must not modify the result)"""
+    return json_loads(Path(config_file).read_bytes())
+
+
+@lru_cache(maxsize=1)
+def load_service_account_info() -> dict:
+    """Load the Google service account key referenced by config.json (cached)"""
+    return json_loads(Path(load_config()['google_service_account_file']).read_bytes())
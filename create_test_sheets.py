@@ -5,36 +5,40 @@ Script to create TEST worksheets in Google Sheets with the latest sync data
 This is a workaround for the JWT signature issue
 """
 
-import pandas as pd
+import csv
+import os
 import gspread
-from google.oauth2 import service_account
-import json
+from gspread.utils import absolute_range_name
+from collections import Counter
 from pathlib import Path
 
+from config_cache import load_config
+from sheets_client import gspread_client, open_target_spreadsheet
+
+def _latest_file(directory, prefix):
+    """Return the most recently modified '<prefix>*.csv' file in directory"""
+    latest_mtime, latest_path = -1, None
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith(prefix) and entry.name.endswith('.csv'):
+                mtime = entry.stat().st_mtime
+                if mtime > latest_mtime:
+                    latest_mtime, latest_path = mtime, entry.path
+    return latest_path
+
 def create_test_worksheets():
     """Create TEST worksheets and populate with latest test data"""
     
     # Load config
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    config = load_config()
     
     try:
         # Setup Google authentication
-        SCOPES = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        credentials = service_account.Credentials.from_service_account_file(
-            config['google_service_account_file'], 
-            scopes=SCOPES
-        )
-        
-        client = gspread.authorize(credentials)
+        gspread_client()
         print("✓ Successfully authenticated with Google")
         
         # Open target spreadsheet
-        target_sheet = client.open(config['target_spreadsheet'])
+        target_sheet = open_target_spreadsheet()
         print(f"✓ Opened spreadsheet: {config['target_spreadsheet']}")
         
         # Find the latest test output files
@@ -44,70 +48,83 @@ def create_test_worksheets():
             return
         
         # Find the latest files
-        order_files = list(test_output_dir.glob('orders_to_append_*.csv'))
-        line_files = list(test_output_dir.glob('order_lines_to_append_*.csv'))
+        latest_order_file = _latest_file(test_output_dir, 'orders_to_append_')
+        latest_line_file = _latest_file(test_output_dir, 'order_lines_to_append_')
         
-        if not order_files:
+        if not latest_order_file or not latest_line_file:
             print("✗ No test order files found. Run the sync in test mode first.")
             return
-            
-        # Get the latest files
-        latest_order_file = max(order_files, key=lambda p: p.stat().st_mtime)
-        latest_line_file = max(line_files, key=lambda p: p.stat().st_mtime)
         
         print(f"✓ Found latest order file: {latest_order_file}")
         print(f"✓ Found latest line file: {latest_line_file}")
         
-        # Read the CSV files
-        orders_df = pd.read_csv(latest_order_file)
-        lines_df = pd.read_csv(latest_line_file)
-        
-        print(f"✓ Loaded {len(orders_df)} orders and {len(lines_df)} order lines")
-        
-        # Create or update TEST Customer Orders worksheet
-        try:
-            test_orders_worksheet = target_sheet.worksheet("TEST Customer Orders")
-            print("✓ Found existing 'TEST Customer Orders' worksheet")
-        except:
-            test_orders_worksheet = target_sheet.add_worksheet(title="TEST Customer Orders", rows=1000, cols=30)
-            print("✓ Created new 'TEST Customer Orders' worksheet")
-        
-        # Create or update TEST Bakery Products Ordered worksheet  
-        try:
-            test_lines_worksheet = target_sheet.worksheet("TEST Bakery Products Ordered")
-            print("✓ Found existing 'TEST Bakery Products Ordered' worksheet")
-        except:
-            test_lines_worksheet = target_sheet.add_worksheet(title="TEST Bakery Products Ordered", rows=1000, cols=30)
-            print("✓ Created new 'TEST Bakery Products Ordered' worksheet")
-        
-        # Clear and update orders worksheet
-        test_orders_worksheet.clear()
-        orders_df_filled = orders_df.fillna('')
-        headers = [orders_df_filled.columns.tolist()]
-        data_rows = orders_df_filled.values.tolist()
-        all_data = headers + data_rows
-        
-        test_orders_worksheet.update('A1', all_data, value_input_option='USER_ENTERED')
-        print(f"✓ Wrote {len(orders_df)} orders to 'TEST Customer Orders' worksheet")
-        
-        # Clear and update order lines worksheet
-        test_lines_worksheet.clear()
-        lines_df_filled = lines_df.fillna('')
-        headers = [lines_df_filled.columns.tolist()]
-        data_rows = lines_df_filled.values.tolist()
-        all_data = headers + data_rows
-        
-        test_lines_worksheet.update('A1', all_data, value_input_option='USER_ENTERED')
-        print(f"✓ Wrote {len(lines_df)} order lines to 'TEST Bakery Products Ordered' worksheet")
+        # Read the CSV files (first row is the header, empty cells stay '')
+        # and collect the summary stats in the same pass over the orders
+        order_type_counts = Counter()
+        total_value = 0.0
+        with open(latest_order_file, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            order_type_idx = header.index('Order Type')
+            total_idx = header.index('Total')
+            orders_rows = [header]
+            for row in reader:
+                orders_rows.append(row)
+                order_type_counts[row[order_type_idx]] += 1
+                total_value += float(row[total_idx] or 0)
+        with open(latest_line_file, newline='') as f:
+            lines_rows = list(csv.reader(f))
+        
+        order_count = len(orders_rows) - 1
+        line_count = len(lines_rows) - 1
+        print(f"✓ Loaded {order_count} orders and {line_count} order lines")
+        
+        # Look up existing worksheets with a single metadata request
+        existing = {ws.title: ws for ws in target_sheet.worksheets()}
+        
+        # Create any missing TEST worksheets in a single batch request
+        test_titles = ["TEST Customer Orders", "TEST Bakery Products Ordered"]
+        missing_titles = [title for title in test_titles if title not in existing]
+        for title in test_titles:
+            if title not in missing_titles:
+                print(f"✓ Found existing '{title}' worksheet")
+        if missing_titles:
+            response = target_sheet.batch_update({'requests': [
+                {'addSheet': {'properties': {
+                    'title': title,
+                    'gridProperties': {'rowCount': 1000, 'columnCount': 30}
+                }}}
+                for title in missing_titles
+            ]})
+            for title, reply in zip(missing_titles, response['replies']):
+                existing[title] = gspread.Worksheet(target_sheet, reply['addSheet']['properties'])
+            for title in missing_titles:
+                print(f"✓ Created new '{title}' worksheet")
+        test_orders_worksheet = existing["TEST Customer Orders"]
+        test_lines_worksheet = existing["TEST Bakery Products Ordered"]
+        
+        # Clear both worksheets and write the new data in two batched requests
+        target_sheet.values_batch_clear(body={'ranges': [
+            absolute_range_name(test_orders_worksheet.title),
+            absolute_range_name(test_lines_worksheet.title)
+        ]})
+        target_sheet.values_batch_update(body={
+            'valueInputOption': 'USER_ENTERED',
+            'data': [
+                {'range': absolute_range_name(test_orders_worksheet.title, 'A1'), 'values': orders_rows},
+                {'range': absolute_range_name(test_lines_worksheet.title, 'A1'), 'values': lines_rows}
+            ]
+        })
+        print(f"✓ Wrote {order_count} orders to 'TEST Customer Orders' worksheet")
+        print(f"✓ Wrote {line_count} order lines to 'TEST Bakery Products Ordered' worksheet")
         
         # Show Order Type distribution
-        order_type_counts = orders_df['Order Type'].value_counts()
         print("\n📊 Order Type Distribution:")
-        for order_type, count in order_type_counts.items():
+        for order_type, count in order_type_counts.most_common():
             print(f"  {order_type}: {count}")
         
         print(f"\n✅ Success! TEST worksheets have been created/updated in Google Sheets")
-        print(f"Total value: ${orders_df['Total'].astype(float).sum():.2f}")
+        print(f"Total value: ${total_value:.2f}")
         
     except Exception as e:
         print(f"✗ Error: {e}")
@@ -3,20 +3,19 @@
 Test script to fix Google Sheets authentication issues
 """
 
-import gspread
-from google.oauth2 import service_account
-import json
 import time
 from datetime import datetime, timezone
 
+from config_cache import load_config, load_service_account_info
+from sheets_client import load_credentials, gspread_client, open_target_spreadsheet
+
 def test_auth_with_fixes():
     """Test authentication with various fixes"""
     
     print("=== Google Sheets Authentication Fix Test ===")
     
     # Load config
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    config = load_config()
     
     service_account_file = config['google_service_account_file']
     target_spreadsheet = config['target_spreadsheet']
@@ -28,27 +27,15 @@ def test_auth_with_fixes():
         # Method 1: Standard approach with explicit scopes
         print("\n--- Method 1: Standard Authentication ---")
         
-        SCOPES = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        credentials = service_account.Credentials.from_service_account_file(
-            service_account_file, 
-            scopes=SCOPES
-        )
-        
-        # Check if credentials are expired and refresh if needed
-        if credentials.expired:
-            print("Credentials expired, refreshing...")
-            credentials.refresh()
-        
-        client = gspread.authorize(credentials)
+        # The access token is fetched lazily by the authorized session on the
+        # first API request, so no manual refresh is needed here
+        load_credentials()
+        gspread_client()
         print("✓ Authentication successful")
         
         # Test spreadsheet access
         try:
-            spreadsheet = client.open(target_spreadsheet)
+            spreadsheet = open_target_spreadsheet()
             print(f"✓ Successfully opened spreadsheet: {spreadsheet.title}")
             
             worksheets = spreadsheet.worksheets()
@@ -98,11 +85,7 @@ def check_service_account_info():
     print("\n=== Service Account Information ===")
     
     try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
-        
-        with open(config['google_service_account_file'], 'r') as f:
-            sa_data = json.load(f)
+        sa_data = load_service_account_info()
         
         print(f"Project ID: {sa_data.get('project_id')}")
         print(f"Client Email: {sa_data.get('client_email')}")
@@ -5,12 +5,19 @@ Test runner for Shopify sync
 This script runs the sync in test mode and creates detailed logs
 """
 
+import argparse
 import os
 import sys
 from datetime import datetime
 from pathlib import Path
 
 def main():
+    parser = argparse.ArgumentParser(description='Run the Shopify sync in test mode')
+    parser.add_argument('-y', '--yes', action='store_true',
+                        help='Skip the confirmation prompt (implied when CI is set)')
+    args = parser.parse_args()
+    assume_yes = args.yes or bool(os.environ.get('CI'))
+    
     print("="*60)
     print("Shopify to Google Sheets Sync - TEST MODE")
     print("="*60)
@@ -22,10 +29,13 @@ def main():
     print("4. Save results to test_output/ directory for review")
     print()
     
-    response = input("Continue with test sync? (y/N): ")
-    if response.lower() != 'y':
-        print("Test sync cancelled.")
-        return
+    if not assume_yes:
+        if not sys.stdin.isatty():
+            sys.exit("Refusing to prompt without a terminal; pass --yes to continue.")
+        response = input("Continue with test sync? (y/N): ")
+        if response.lower() != 'y':
+            print("Test sync cancelled.")
+            return
     
     print("\nRunning test sync...")
     print("-"*60)
@@ -33,8 +43,9 @@ def main():
     # Create test output directory
     Path('test_output').mkdir(exist_ok=True)
     
-    # Run the sync in test mode
-    os.system('python shopify_sheets_sync.py --test')
+    # Run the sync in test mode in this interpreter
+    from shopify_sheets_sync import main as run_sync
+    run_sync(test_mode=True)
     
     print("-"*60)
     print("\nTest sync complete!")
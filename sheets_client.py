@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Shared Google Sheets client for the helper scripts
+The service account credentials, the authorized gspread client and the
+target spreadsheet handle are created once per process and reused, so
+chained checks don't repeat the Google token exchange.
+"""
+
+from functools import lru_cache
+
+import gspread
+from google.oauth2 import service_account
+
+from config_cache import load_config, load_service_account_info
+
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+
+
+@lru_cache(maxsize=1)
+def load_credentials() -> service_account.Credentials:
+    """Create service account credentials for the Sheets and Drive scopes (cached)"""
+    # Built from the cached key info, so the key file is parsed once per process
+    return service_account.Credentials.from_service_account_info(
+        load_service_account_info(),
+        scopes=SCOPES
+    )
+
+
+@lru_cache(maxsize=1)
+def gspread_client() -> gspread.Client:
+    """Return an authorized gspread client shared by all callers"""
+    return gspread.authorize(load_credentials())
+
+
+@lru_cache(maxsize=1)
+def open_target_spreadsheet() -> gspread.Spreadsheet:
+    """Open the configured target spreadsheet once and reuse the handle"""
+    config = load_config()
+    if config.get('target_spreadsheet_id'):
+        return gspread_client().open_by_key(config['target_spreadsheet_id'])
+    return gspread_client().open(config['target_spreadsheet'])
@@ -13,20 +13,35 @@ This script syncs orders from Shopify to Google Sheets with enhanced reliability
 import gspread
 import requests
 import json
+import re
 import pandas as pd
 import os
 import logging
 import time
 import sqlite3
 import hashlib
-from typing import List, Dict, Optional, Tuple, Any
+import atexit
+from typing import List, Optional, Tuple, Any
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 # from gspread_pandas import Spread  # Not using this due to auth issues
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from google.oauth2 import service_account
+from gspread.utils import absolute_range_name, rowcol_to_a1
 from pathlib import Path
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from config_cache import json_loads, load_config
+
+try:
+    # pyarrow is optional; its C CSV writer is much faster on large exports
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
 # Configure logging with more detail
 logging.basicConfig(
     level=logging.INFO,
@@ -38,6 +53,146 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Key fields that indicate order changes
+ORDER_HASH_FIELDS = (
+    'total_price', 'subtotal_price', 'total_tax',
+    'customer', 'billing_address', 'shipping_address',
+    'fulfillment_status', 'financial_status'
+)
+
+# Same output as json.dumps(..., sort_keys=True) without rebuilding an
+# encoder per call; stored hashes must stay byte-for-byte stable
+_HASH_ENCODER = json.JSONEncoder(sort_keys=True)
+
+
+def _digest(data) -> str:
+    """SHA-256 hex digest of a JSON-serialisable value for change detection"""
+    # Not a security use; lets OpenSSL's accelerated SHA-256 run under FIPS builds too
+    return hashlib.sha256(_HASH_ENCODER.encode(data).encode(), usedforsecurity=False).hexdigest()
+
+
+# Note attribute names mapped to the keys used by transform_orders_for_sheets
+NOTE_ATTRIBUTE_KEYS = {
+    'Pickup-Date': 'pickupDate',
+    'Pickup-Time': 'pickupTime',
+    'Checkout-Method': 'checkoutMethod',
+    'Shipping Date': 'shippingDate',
+    'Shipping-Date': 'shippingDate'
+}
+
+# Line item properties copied into the sheet
+LINE_ITEM_PROPERTIES = frozenset([
+    'Cake Writing', 'Writing-Color', 'Special-Pickup-Date', 'Special-Pickup-Time'
+])
+
+# Lowercase tag -> order type, in priority order
+ORDER_TYPE_TAGS = (
+    ('pickup order', 'Pickup Order'),
+    ('nationwide shipping', 'Nationwide Shipping'),
+    ('local delivery order', 'Local Delivery Order')
+)
+
+# Concurrent single-order lookups during reconciliation; each worker also
+# backs off on the call-limit header (see _fetch_order_by_number)
+RECONCILE_FETCH_WORKERS = 4
+
+_NON_DIGITS = re.compile(r'[^0-9]')
+
+
+def _web_order_number(web_id: str) -> Optional[int]:
+    """Numeric part of a WebOrderID cell (e.g. 'WEB1234' -> 1234), or None"""
+    if not (web_id.isascii() and web_id.isdigit()):
+        web_id = _NON_DIGITS.sub('', web_id)
+    return int(web_id) if web_id else None
+
+
+# Statements written on every sync, shared by their call sites
+_SQL_INSERT_TRACKING = '''
+    INSERT OR REPLACE INTO order_tracking
+    (shopify_order_id, order_number, created_at, updated_at, order_hash, line_items_hash, sync_status)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+_SQL_INSERT_HISTORY = '''
+    INSERT INTO sync_history (orders_processed, orders_new, orders_updated, status, error_message)
+    VALUES (?, ?, ?, ?, ?)
+'''
+_SQL_INSERT_ERROR = '''
+    INSERT INTO sync_errors (error_timestamp, order_id, error_type, error_message)
+    VALUES (?, ?, ?, ?)
+'''
+
+
+def connect_database(db_path: str) -> sqlite3.Connection:
+    """Open the tracking database with the pragmas every caller should use"""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    # The tracker can be rebuilt from Shopify, so WAL + NORMAL sync is safe
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-50000')
+    conn.execute('PRAGMA mmap_size=268435456')
+    return conn
+
+
+def _write_csv(df: pd.DataFrame, path: str):
+    """Write a DataFrame to CSV, via pyarrow when it is installed"""
+    if pa is not None:
+        try:
+            pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+            return
+        except pa.ArrowException as e:
+            # e.g. a column mixing types Arrow can't unify
+            logger.debug(f"pyarrow CSV export failed, using pandas: {e}")
+    df.to_csv(path, index=False)
+
+
+def _df_to_values(df: pd.DataFrame, header: bool = False) -> List[list]:
+    """Rows of a DataFrame as lists for the Sheets API, missing values blanked"""
+    values = df.to_numpy(dtype=object, na_value='').tolist()
+    return [df.columns.tolist()] + values if header else values
+
+
+def _column_range(col: int) -> str:
+    """A1 range covering a whole column below the header row, e.g. 'B2:B'"""
+    column = rowcol_to_a1(1, col)[:-1]
+    return f"{column}2:{column}"
+
+
+# Google access tokens last an hour; with cache_google_token enabled, later
+# runs reuse one instead of repeating the OAuth exchange. Owner-only file.
+GOOGLE_TOKEN_CACHE = Path.home() / '.cache' / 'bsbshopify' / 'gtoken.json'
+
+
+def _load_google_token(credentials) -> bool:
+    """Apply a cached access token to credentials; True if it is still valid"""
+    try:
+        cached = json.loads(GOOGLE_TOKEN_CACHE.read_text())
+        if (cached['account'] != credentials.service_account_email
+                or cached['scopes'] != list(credentials.scopes or [])):
+            return False
+        credentials.token = cached['token']
+        credentials.expiry = datetime.fromisoformat(cached['expiry'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+    return credentials.valid
+
+
+def _save_google_token(credentials):
+    """Persist the credentials' current access token for later runs"""
+    tmp_path = GOOGLE_TOKEN_CACHE.with_suffix('.tmp')
+    try:
+        GOOGLE_TOKEN_CACHE.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+            json.dump({
+                'account': credentials.service_account_email,
+                'scopes': list(credentials.scopes or []),
+                'token': credentials.token,
+                'expiry': credentials.expiry.isoformat()
+            }, f)
+        os.replace(tmp_path, GOOGLE_TOKEN_CACHE)
+    except OSError as e:
+        logger.debug(f"Could not cache Google access token: {e}")
+
 
 class ShopifyOrderSync:
     """Main class for syncing Shopify orders to Google Sheets"""
@@ -48,7 +203,10 @@ class ShopifyOrderSync:
         self.db_path = self.config.get('db_path', 'shopify_sync.db')
         self.session = self._create_session()
         self.google_client = None
+        self._conn = self._create_connection()
+        self._error_buffer: List[tuple] = []
         self._init_database()
+        atexit.register(self.close)
         
     def _load_config(self, config_file: str) -> dict:
         """Load configuration from file or environment variables"""
@@ -58,19 +216,19 @@ class ShopifyOrderSync:
             'google_service_account_file': os.environ.get('GOOGLE_SERVICE_ACCOUNT_FILE', ''),
             'template_spreadsheet': os.environ.get('TEMPLATE_SPREADSHEET', 'Customer Orders'),
             'target_spreadsheet': os.environ.get('TARGET_SPREADSHEET', 'Customer Orders-3-1'),
+            'target_spreadsheet_id': os.environ.get('TARGET_SPREADSHEET_ID', ''),
             'lookback_days': int(os.environ.get('LOOKBACK_DAYS', '30')),
             'batch_size': int(os.environ.get('BATCH_SIZE', '250')),
             'max_retries': int(os.environ.get('MAX_RETRIES', '3')),
-            'retry_delay': int(os.environ.get('RETRY_DELAY', '5'))
+            'retry_delay': int(os.environ.get('RETRY_DELAY', '5')),
+            'cache_google_token': os.environ.get('CACHE_GOOGLE_TOKEN', '').lower() == 'true'
         }
         
         # Try to load from config file if exists
         if Path(config_file).exists():
             try:
-                with open(config_file, 'r') as f:
-                    file_config = json.load(f)
-                    config.update(file_config)
-                    logger.info(f"Loaded configuration from {config_file}")
+                config.update(load_config(config_file))
+                logger.info(f"Loaded configuration from {config_file}")
             except Exception as e:
                 logger.warning(f"Could not load config file: {e}")
         
@@ -91,15 +249,21 @@ class ShopifyOrderSync:
             allowed_methods=["HEAD", "GET", "OPTIONS"],  # Changed from method_whitelist
             backoff_factor=1
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # Keep enough pooled connections to reuse TLS sessions under concurrent fetches
+        adapter = HTTPAdapter(pool_maxsize=32, max_retries=retry_strategy)
         session.mount("https://", adapter)
         session.mount("http://", adapter)
+        # Every Shopify call authenticates the same way
+        session.headers["X-Shopify-Access-Token"] = self.config['shopify_access_token']
         return session
         
+    def _create_connection(self) -> sqlite3.Connection:
+        """Open the tracking database connection shared by all methods"""
+        return connect_database(self.db_path)
+    
     def _init_database(self):
         """Initialize SQLite database for tracking synced orders"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._conn.cursor()
         
         # Create tables for tracking
         cursor.execute('''
@@ -128,6 +292,12 @@ class ShopifyOrderSync:
             )
         ''')
         
+        # Lets the "latest synced order" lookup use an index probe
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tracking_status_created
+            ON order_tracking (sync_status, created_at DESC)
+        ''')
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS sync_errors (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -140,8 +310,7 @@ class ShopifyOrderSync:
             )
         ''')
         
-        conn.commit()
-        conn.close()
+        self._conn.commit()
         logger.info("Database initialized successfully")
     
     def setup_google_auth(self) -> gspread.Client:
@@ -156,6 +325,11 @@ class ShopifyOrderSync:
                 self.config['google_service_account_file'], 
                 scopes=SCOPES
             )
+            # Opt-in: fetch a token up front (gspread would on its first request)
+            # unless an earlier run left one that is still valid
+            if self.config['cache_google_token'] and not _load_google_token(credentials):
+                credentials.refresh(GoogleAuthRequest())
+                _save_google_token(credentials)
             
             client = gspread.authorize(credentials)
             logger.info("Successfully authenticated with Google")
@@ -167,34 +341,37 @@ class ShopifyOrderSync:
             logger.error(f"Authentication error: {e}")
             raise
     
+    def open_target_spreadsheet(self) -> gspread.Spreadsheet:
+        """Open the target spreadsheet, by key when target_spreadsheet_id is set"""
+        spreadsheet_id = self.config.get('target_spreadsheet_id')
+        if spreadsheet_id:
+            # Skips the Drive search by title that open() performs
+            return self.google_client.open_by_key(spreadsheet_id)
+        return self.google_client.open(self.config['target_spreadsheet'])
+    
     def _calculate_order_hash(self, order: dict) -> str:
         """Calculate hash of order data to detect changes"""
-        # Select key fields that indicate order changes
-        key_fields = [
-            'total_price', 'subtotal_price', 'total_tax',
-            'customer', 'billing_address', 'shipping_address',
-            'fulfillment_status', 'financial_status'
-        ]
-        
-        hash_data = {field: order.get(field, '') for field in key_fields}
-        hash_string = json.dumps(hash_data, sort_keys=True)
-        return hashlib.sha256(hash_string.encode()).hexdigest()
+        return _digest({field: order.get(field, '') for field in ORDER_HASH_FIELDS})
     
     def _calculate_line_items_hash(self, line_items: List[dict]) -> str:
         """Calculate hash of line items to detect changes"""
-        items_data = []
-        for item in line_items:
-            item_data = {
+        return _digest([
+            {
                 'product_id': item.get('product_id'),
                 'variant_id': item.get('variant_id'),
                 'quantity': item.get('quantity'),
                 'price': item.get('price'),
                 'properties': item.get('properties', [])
             }
-            items_data.append(item_data)
-        
-        hash_string = json.dumps(items_data, sort_keys=True)
-        return hashlib.sha256(hash_string.encode()).hexdigest()
+            for item in line_items
+        ])
+    
+    def _order_hashes(self, order: dict) -> Tuple[str, str]:
+        """(order_hash, line_items_hash) for an order, computed once and kept on the order"""
+        if '_order_hash' not in order:
+            order['_order_hash'] = self._calculate_order_hash(order)
+            order['_line_items_hash'] = self._calculate_line_items_hash(order.get('line_items', []))
+        return order['_order_hash'], order['_line_items_hash']
     
     def fetch_shopify_orders(self, since_date: Optional[datetime] = None) -> List[dict]:
         """Fetch orders from Shopify with comprehensive error handling"""
@@ -202,14 +379,12 @@ class ShopifyOrderSync:
         
         if not since_date:
             # Get the last successful sync date from database
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT MAX(created_at) FROM order_tracking 
+            result = self._conn.execute('''
+                SELECT created_at FROM order_tracking 
                 WHERE sync_status = 'synced'
-            ''')
-            result = cursor.fetchone()
-            conn.close()
+                ORDER BY created_at DESC
+                LIMIT 1
+            ''').fetchone()
             
             if result and result[0]:
                 since_date = datetime.fromisoformat(result[0])
@@ -223,10 +398,6 @@ class ShopifyOrderSync:
         base_url = f"https://{self.config['shopify_store_name']}.myshopify.com"
         url = f"{base_url}/admin/api/2023-04/orders.json"
         
-        headers = {
-            "X-Shopify-Access-Token": self.config['shopify_access_token'],
-        }
-        
         params = {
             'limit': self.config['batch_size'],
             'status': 'any',
@@ -238,34 +409,28 @@ class ShopifyOrderSync:
         page_count = 0
         while url:
             try:
-                response = self.session.get(url, headers=headers, params=params if page_count == 0 else None, timeout=30)
+                response = self.session.get(url, params=params if page_count == 0 else None, timeout=30)
                 response.raise_for_status()
                 
-                data = response.json()
+                data = json_loads(response.content)
                 orders_batch = data.get('orders', [])
                 orders.extend(orders_batch)
                 
                 page_count += 1
                 logger.info(f"Fetched page {page_count}: {len(orders_batch)} orders (total: {len(orders)})")
                 
-                # Extract next page URL from Link header
-                link_header = response.headers.get('Link', None)
-                next_link = None
-                if link_header:
-                    links = link_header.split(',')
-                    for link in links:
-                        if 'rel="next"' in link:
-                            next_link = link.split(';')[0].strip('<> ')
-                            break
-                url = next_link
+                # Next page URL from the Link header, as parsed by requests
+                url = response.links.get('next', {}).get('url')
                 
                 # Clear params after first request (they're in the URL now)
                 params = None
                 
-                # Rate limiting protection
-                time.sleep(0.5)
+                # Rate limiting protection, only once the call bucket fills up
+                if url:
+                    self._throttle(response)
                 
-            except requests.exceptions.RequestException as e:
+            # json_loads raises a plain ValueError on a malformed body
+            except (requests.exceptions.RequestException, ValueError) as e:
                 logger.error(f"Error fetching orders from Shopify: {e}")
                 self._log_sync_error(None, 'api_fetch', str(e))
                 
@@ -279,57 +444,74 @@ class ShopifyOrderSync:
         logger.info(f"Total orders fetched: {len(orders)}")
         return orders
     
+    def _throttle(self, response: requests.Response, pause: float = 0.5):
+        """Pause between requests when Shopify's API call bucket is nearly full"""
+        # Header looks like "32/40": calls used / bucket size
+        try:
+            used, size = map(int, response.headers['X-Shopify-Shop-Api-Call-Limit'].split('/'))
+        except (KeyError, ValueError):
+            time.sleep(pause)
+            return
+        
+        if used >= size * 3 // 4:
+            time.sleep(pause)
+    
+    def close(self):
+        """Flush buffered errors and close the tracking database"""
+        self._flush_errors()
+        self._conn.close()
+    
     def _log_sync_error(self, order_id: Optional[str], error_type: str, error_message: str):
         """Log sync errors to database for tracking"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO sync_errors (order_id, error_type, error_message)
-            VALUES (?, ?, ?)
-        ''', (order_id, error_type, error_message))
-        conn.commit()
-        conn.close()
-    
-    def get_existing_order_data(self) -> Dict[str, dict]:
-        """Get existing order data from database for comparison"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT shopify_order_id, order_number, order_hash, line_items_hash, sync_timestamp
-            FROM order_tracking
-            WHERE sync_status = 'synced'
-        ''')
-        
-        existing_orders = {}
-        for row in cursor.fetchall():
-            existing_orders[row[0]] = {
-                'order_number': row[1],
-                'order_hash': row[2],
-                'line_items_hash': row[3],
-                'sync_timestamp': row[4]
-            }
-        
-        conn.close()
-        return existing_orders
+        # Buffered and written in one transaction by _flush_errors; the
+        # timestamp is taken now so rows keep the time the error happened
+        error_timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        self._error_buffer.append((error_timestamp, order_id, error_type, error_message))
+    
+    def _flush_errors(self):
+        """Write buffered sync errors to the database"""
+        if not self._error_buffer:
+            return
+        with self._conn:
+            self._conn.executemany(_SQL_INSERT_ERROR, self._error_buffer)
+        self._error_buffer.clear()
     
     def identify_new_and_updated_orders(self, shopify_orders: List[dict]) -> Tuple[List[dict], List[dict]]:
         """Identify which orders are new and which have been updated"""
-        existing_orders = self.get_existing_order_data()
+        incoming = [(str(order['id']), *self._order_hashes(order)) for order in shopify_orders]
+        
+        # Compare against the tracking table inside SQLite instead of loading
+        # the whole history into Python; maps order id -> is_new for changes
+        with self._conn:
+            self._conn.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS incoming_orders (
+                    order_id TEXT PRIMARY KEY,
+                    order_hash TEXT,
+                    line_items_hash TEXT
+                )
+            ''')
+            self._conn.execute('DELETE FROM incoming_orders')
+            self._conn.executemany('INSERT OR REPLACE INTO incoming_orders VALUES (?, ?, ?)', incoming)
+            changes = dict(self._conn.execute('''
+                SELECT i.order_id, t.shopify_order_id IS NULL
+                FROM incoming_orders i
+                LEFT JOIN order_tracking t
+                    ON t.shopify_order_id = i.order_id AND t.sync_status = 'synced'
+                WHERE t.shopify_order_id IS NULL
+                   OR t.order_hash IS NOT i.order_hash
+                   OR t.line_items_hash IS NOT i.line_items_hash
+            '''))
+        
         new_orders = []
         updated_orders = []
-        
         for order in shopify_orders:
-            order_id = str(order['id'])
-            order_hash = self._calculate_order_hash(order)
-            line_items_hash = self._calculate_line_items_hash(order.get('line_items', []))
-            
-            if order_id not in existing_orders:
+            is_new = changes.get(str(order['id']))
+            if is_new is None:
+                continue
+            if is_new:
                 new_orders.append(order)
             else:
-                existing = existing_orders[order_id]
-                if (existing['order_hash'] != order_hash or 
-                    existing['line_items_hash'] != line_items_hash):
-                    updated_orders.append(order)
+                updated_orders.append(order)
         
         logger.info(f"Identified {len(new_orders)} new orders and {len(updated_orders)} updated orders")
         return new_orders, updated_orders
@@ -337,42 +519,53 @@ class ShopifyOrderSync:
     def get_max_web_orderid_from_sheets(self) -> Tuple[int, str]:
         """Get the maximum WebOrderID from the target spreadsheet"""
         try:
-            target_sheet = self.google_client.open(self.config['target_spreadsheet'])
+            target_sheet = self.open_target_spreadsheet()
             worksheet = target_sheet.worksheet("Customer Orders")
             
-            all_data = worksheet.get_all_values()
-            if not all_data or len(all_data) <= 1:
-                logger.warning("Target spreadsheet has no order data")
-                return 0, "Order Type"
-            
-            headers = all_data[0]
-            data = all_data[1:]
-            current_orders_df = pd.DataFrame(data, columns=headers)
+            headers = worksheet.row_values(1)
             
             # Find columns
-            web_order_id_col = None
             order_type_col = None
+            web_col_idx = None
+            type_col_idx = None
             
-            for col in current_orders_df.columns:
+            for idx, col in enumerate(headers, start=1):
                 if 'WebOrderID' in col:
-                    web_order_id_col = col
+                    web_col_idx = idx
                 if 'Order Type' in col:
-                    order_type_col = col
+                    order_type_col, type_col_idx = col, idx
             
-            if not order_type_col:
-                order_type_col = "Order Type"
+            if not type_col_idx:
+                logger.warning("Target spreadsheet has no Order Type column")
+                return 0, "Order Type"
             
-            if web_order_id_col and order_type_col:
-                web_orders = current_orders_df[current_orders_df[order_type_col].str.contains('Web', na=False)]
-                
-                if not web_orders.empty:
-                    numeric_ids = web_orders[web_order_id_col].str.replace('[^0-9]', '', regex=True)
-                    numeric_ids = pd.to_numeric(numeric_ids, errors='coerce')
-                    
-                    if not numeric_ids.isna().all():
-                        max_id = int(numeric_ids.max())
-                        logger.info(f"Found maximum WebOrderID in sheets: {max_id}")
-                        return max_id, order_type_col
+            if not web_col_idx:
+                return 0, order_type_col
+            
+            # Let Sheets filter the Web rows server-side when it can
+            max_id = self._query_max_web_orderid(worksheet, web_col_idx, type_col_idx)
+            if max_id is not None:
+                logger.info(f"Found maximum WebOrderID in sheets: {max_id}")
+                return max_id, order_type_col
+            
+            # Fetch only the two columns needed instead of the whole sheet
+            ranges = [_column_range(web_col_idx), _column_range(type_col_idx)]
+            web_ids, order_types = (
+                value_range[0] if value_range else []
+                for value_range in worksheet.batch_get(ranges, major_dimension='COLUMNS')
+            )
+            if not order_types:
+                logger.warning("Target spreadsheet has no order data")
+                return 0, order_type_col
+            
+            max_id = max(
+                (number for web_id, order_type in zip(web_ids, order_types)
+                 if 'Web' in order_type and (number := _web_order_number(web_id)) is not None),
+                default=None
+            )
+            if max_id is not None:
+                logger.info(f"Found maximum WebOrderID in sheets: {max_id}")
+                return max_id, order_type_col
             
             return 0, order_type_col
             
@@ -380,6 +573,53 @@ class ShopifyOrderSync:
             logger.error(f"Error getting max WebOrderID from sheets: {e}")
             return 0, "Order Type"
     
+    def _query_max_web_orderid(self, worksheet, web_col_idx: int, type_col_idx: int) -> Optional[int]:
+        """Max WebOrderID of Web rows via a Sheets query, or None to fall back to reading columns"""
+        web_col = rowcol_to_a1(1, web_col_idx)[:-1]
+        type_col = rowcol_to_a1(1, type_col_idx)[:-1]
+        try:
+            response = self.google_client.session.get(
+                f"https://docs.google.com/spreadsheets/d/{worksheet.spreadsheet.id}/gviz/tq",
+                params={
+                    'tqx': 'out:json',
+                    'gid': worksheet.id,
+                    'headers': 1,
+                    'tq': f"SELECT {web_col} WHERE {type_col} CONTAINS 'Web'"
+                },
+                timeout=30
+            )
+            response.raise_for_status()
+            
+            # Body is JSON wrapped in google.visualization.Query.setResponse(...);
+            text = response.text
+            payload = json.loads(text[text.index('(') + 1:text.rindex(')')])
+        except Exception as e:
+            logger.debug(f"Sheets query for max WebOrderID failed: {e}")
+            return None
+        
+        if payload.get('status') != 'ok':
+            return None
+        
+        rows = payload.get('table', {}).get('rows', [])
+        numeric_ids = []
+        for row in rows:
+            cell = row['c'][0] if row.get('c') else None
+            # Sheets nulls out values that don't match the column's inferred
+            # type, so any gap means the query result can't be trusted
+            if not cell or cell.get('v') is None:
+                return None
+            value = cell['v']
+            if isinstance(value, (int, float)):
+                numeric_ids.append(int(value))
+            else:
+                number = _web_order_number(str(value))
+                if number is not None:
+                    numeric_ids.append(number)
+        
+        # An empty result is confirmed against the sheet itself before
+        # allowing every new order through
+        return max(numeric_ids) if numeric_ids else None
+    
     def validate_order_completeness(self, orders: List[dict]) -> List[str]:
         """Validate that we have all expected orders"""
         issues = []
@@ -387,26 +627,24 @@ class ShopifyOrderSync:
         if not orders:
             return issues
         
-        # Sort orders by order_number
-        sorted_orders = sorted(orders, key=lambda x: x.get('order_number', 0))
-        
         # Check for gaps in order numbers
-        order_numbers = [o.get('order_number') for o in sorted_orders if o.get('order_number')]
+        order_numbers = [o.get('order_number') for o in orders if o.get('order_number')]
+        counts = Counter(order_numbers)
         
         if order_numbers:
-            min_num = min(order_numbers)
-            max_num = max(order_numbers)
+            min_num = min(counts)
+            max_num = max(counts)
             expected_count = max_num - min_num + 1
             
             if len(order_numbers) < expected_count:
-                missing = set(range(min_num, max_num + 1)) - set(order_numbers)
+                missing = set(range(min_num, max_num + 1)).difference(counts)
                 if missing:
                     issues.append(f"Missing order numbers: {sorted(missing)}")
         
         # Check for duplicate order numbers
-        duplicates = [num for num in order_numbers if order_numbers.count(num) > 1]
+        duplicates = {num for num, count in counts.items() if count > 1}
         if duplicates:
-            issues.append(f"Duplicate order numbers found: {set(duplicates)}")
+            issues.append(f"Duplicate order numbers found: {duplicates}")
         
         return issues
     
@@ -415,7 +653,16 @@ class ShopifyOrderSync:
         if not orders:
             return pd.DataFrame(), pd.DataFrame()
         
-        rows = []
+        # Collect values column by column so the DataFrame is built without
+        # reboxing a row-major list of lists
+        columns = {name: [] for name in (
+            "Order Number", "Order Date", "WebOrderID", "First Name", "Last Name",
+            "Customer Email", "Customer Phone", "Line Number", "Line Item", "Variant Title",
+            "Cake Writing", "Writing Color", "Line Item Qty", "Line Item Price", "Order Subtotal",
+            "Order Taxes", "Order Total", "Fulfillment Status", "Pickup Date", "Pickup Time",
+            "Pickup Method", "Special Pickup Date", "Special Pickup Time", "Order Type"
+        )}
+        column_values = list(columns.values())
         
         for order in orders:
             order_number = order.get("order_number", "")
@@ -443,10 +690,6 @@ class ShopifyOrderSync:
                     index += 1
                     title = line_item.get("title", "")
                     variant_title = line_item.get("variant_title", "")
-                    cake_writing = ""
-                    writing_color = ""
-                    special_pickup_date = ""
-                    special_pickup_time = ""
                     quantity = line_item.get("quantity", 0)
                     price = line_item.get("price", 0)
                     subtotal = quantity * float(price)
@@ -455,42 +698,35 @@ class ShopifyOrderSync:
                     line_number = index
                     
                     # Extract properties
+                    properties = {}
                     if "properties" in line_item:
                         for property in line_item["properties"]:
-                            if property.get("name") == "Cake Writing":
-                                cake_writing = property.get("value", "")
-                            elif property.get("name") == "Writing-Color":
-                                writing_color = property.get("value", "")
-                            elif property.get("name") == "Special-Pickup-Date":
-                                special_pickup_date = property.get("value", "")
-                            elif property.get("name") == "Special-Pickup-Time":
-                                special_pickup_time = property.get("value", "")
+                            name = property.get("name")
+                            if name in LINE_ITEM_PROPERTIES:
+                                properties[name] = property.get("value", "")
+                    cake_writing = properties.get("Cake Writing", "")
+                    writing_color = properties.get("Writing-Color", "")
+                    special_pickup_date = properties.get("Special-Pickup-Date", "")
+                    special_pickup_time = properties.get("Special-Pickup-Time", "")
                     
                     # Determine the pickup/shipping date
                     pickup_date = note_attributes.get("pickupDate", "")
                     if not pickup_date and note_attributes.get("shippingDate"):
                         pickup_date = note_attributes.get("shippingDate", "")
                     
-                    row_data = [
+                    row_data = (
                         order_number, order_date, weborderid, customer_name, customer_last_name,
                         customer_email, customer_phone, line_number, title, variant_title,
                         cake_writing, writing_color, quantity, price, subtotal, taxes, total,
                         fulfillment_status, pickup_date,
                         note_attributes.get("pickupTime", ""), note_attributes.get("checkoutMethod", ""),
                         special_pickup_date, special_pickup_time, order_type
-                    ]
-                    rows.append(row_data)
+                    )
+                    for values, value in zip(column_values, row_data):
+                        values.append(value)
         
-        # Create DataFrame
-        columns = [
-            "Order Number", "Order Date", "WebOrderID", "First Name", "Last Name",
-            "Customer Email", "Customer Phone", "Line Number", "Line Item", "Variant Title",
-            "Cake Writing", "Writing Color", "Line Item Qty", "Line Item Price", "Order Subtotal",
-            "Order Taxes", "Order Total", "Fulfillment Status", "Pickup Date", "Pickup Time",
-            "Pickup Method", "Special Pickup Date", "Special Pickup Time", "Order Type"
-        ]
-        
-        order_data_df = pd.DataFrame(rows, columns=columns)
+        # Create DataFrame straight from the column lists
+        order_data_df = pd.DataFrame(columns)
         
         # Process orders and order lines
         return self._process_order_dataframes(order_data_df)
@@ -499,16 +735,9 @@ class ShopifyOrderSync:
         """Extract note attributes from order"""
         note_attributes = {}
         for attribute in attributes:
-            if attribute.get("name") == "Pickup-Date":
-                note_attributes["pickupDate"] = attribute.get("value", "")
-            elif attribute.get("name") == "Pickup-Time":
-                note_attributes["pickupTime"] = attribute.get("value", "")
-            elif attribute.get("name") == "Checkout-Method":
-                note_attributes["checkoutMethod"] = attribute.get("value", "")
-            elif attribute.get("name") == "Shipping Date":
-                note_attributes["shippingDate"] = attribute.get("value", "")
-            elif attribute.get("name") == "Shipping-Date":
-                note_attributes["shippingDate"] = attribute.get("value", "")
+            key = NOTE_ATTRIBUTE_KEYS.get(attribute.get("name"))
+            if key:
+                note_attributes[key] = attribute.get("value", "")
         return note_attributes
     
     def _get_order_type_from_tags(self, tags: str) -> str:
@@ -519,16 +748,9 @@ class ShopifyOrderSync:
         # Convert tags to lowercase for case-insensitive matching
         tags_lower = tags.lower()
         
-        # Priority order: check for specific tags
-        if "pickup order" in tags_lower:
-            return "Pickup Order"
-        elif "nationwide shipping" in tags_lower:
-            return "Nationwide Shipping"
-        elif "local delivery order" in tags_lower:
-            return "Local Delivery Order"
-        else:
-            # If none of the expected tags found, return "Web" as default
-            return "Web"
+        # Priority order: first matching tag wins, regardless of its position
+        # in the tag string. If none of the expected tags found, return "Web"
+        return next((order_type for tag, order_type in ORDER_TYPE_TAGS if tag in tags_lower), "Web")
     
     def _process_order_dataframes(self, order_data_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """Process raw order data into final format for sheets"""
@@ -558,7 +780,11 @@ class ShopifyOrderSync:
         ]].drop_duplicates(subset=['OrderID'])
         
         # Format dates
-        base_order_df['Order Date'] = pd.to_datetime(base_order_df['Order Date'], errors='coerce', utc=True)
+        # created_at is always ISO 8601; naming the format keeps parsing on the
+        # vectorised path instead of re-inferring it on every sync
+        base_order_df['Order Date'] = pd.to_datetime(
+            base_order_df['Order Date'], errors='coerce', utc=True, format='ISO8601'
+        )
         base_order_df['Order Date'] = base_order_df['Order Date'].dt.strftime('%m-%d-%Y')
         
         # Format Due Pickup Date to MM-DD-YYYY
@@ -571,60 +797,60 @@ class ShopifyOrderSync:
                 base_order_df.loc[valid_dates_mask, 'Due Pickup Date'] = pickup_dates_dt.loc[valid_dates_mask].dt.strftime('%m-%d-%Y')
         
         # Create order_df with all columns in the correct order to match Google Sheet
-        order_df = pd.DataFrame()
-        order_df['Status'] = 'New'
-        order_df['Order Date'] = base_order_df['Order Date']
-        order_df['OrderID'] = base_order_df['OrderID']
-        order_df['WebOrderID'] = base_order_df['WebOrderID']
-        order_df['Special'] = ''
-        order_df['TextNumber'] = ''
-        order_df['Pickup Timestamp'] = ''
-        order_df['Due Date'] = ''
-        order_df['Customer Name'] = ''
-        order_df['Due Pickup Date'] = base_order_df['Due Pickup Date']
-        order_df['Due Pickup Time'] = base_order_df['Due Pickup Time']
-        order_df['Customer First Name'] = base_order_df['Customer First Name']
-        order_df['Customer Last Name'] = base_order_df['Customer Last Name']
-        order_df['Address'] = ''
-        order_df['Email'] = base_order_df['Email']
-        order_df['City'] = ''
-        order_df['Country'] = ''
-        order_df['PhoneNumber'] = base_order_df['PhoneNumber']
-        order_df['Taxes'] = ''
-        order_df['TextOk'] = ''
-        order_df['EmailOk'] = ''
-        order_df['Total'] = base_order_df['Total']
-        order_df['Order Type'] = base_order_df['Order Type']
-        order_df['Updated'] = ''
-        order_df['LineItems'] = ''
-        order_df['Order Count'] = ''
-        order_df['Order Notes'] = ''
-        order_df['Location'] = ''
-        order_df['Order Image'] = ''
-        order_df['OrderLineItemHeader'] = ''
-        order_df['TopofFormHeader'] = ''
-        order_df['FormDescriptionHeader'] = ''
-        order_df['DueDateRulesHeader'] = ''
-        order_df['Printed'] = ''
-        order_df['ChangeTimeStamp'] = ''
-        order_df['Order Change Notes'] = ''
-        order_df['Order Taker'] = 'Web'
-        order_df['Customer Ready Text Sent'] = ''
-        order_df['Late Pickup Reminder Sent'] = ''
-        order_df['PickupReminderSent'] = ''
+        order_df = pd.DataFrame({
+            # Assigning 'New' to the empty frame never took effect, so
+            # Status has always gone out blank; keep it that way
+            'Status': None,
+            'Order Date': base_order_df['Order Date'],
+            'OrderID': base_order_df['OrderID'],
+            'WebOrderID': base_order_df['WebOrderID'],
+            'Special': '',
+            'TextNumber': '',
+            'Pickup Timestamp': '',
+            'Due Date': '',
+            'Customer Name': '',
+            'Due Pickup Date': base_order_df['Due Pickup Date'],
+            'Due Pickup Time': base_order_df['Due Pickup Time'],
+            'Customer First Name': base_order_df['Customer First Name'],
+            'Customer Last Name': base_order_df['Customer Last Name'],
+            'Address': '',
+            'Email': base_order_df['Email'],
+            'City': '',
+            'Country': '',
+            'PhoneNumber': base_order_df['PhoneNumber'],
+            'Taxes': '',
+            'TextOk': '',
+            'EmailOk': '',
+            'Total': base_order_df['Total'],
+            'Order Type': base_order_df['Order Type'],
+            'Updated': '',
+            'LineItems': '',
+            'Order Count': '',
+            'Order Notes': '',
+            'Location': '',
+            'Order Image': '',
+            'OrderLineItemHeader': '',
+            'TopofFormHeader': '',
+            'FormDescriptionHeader': '',
+            'DueDateRulesHeader': '',
+            'Printed': '',
+            'ChangeTimeStamp': '',
+            'Order Change Notes': '',
+            'Order Taker': 'Web',
+            'Customer Ready Text Sent': '',
+            'Late Pickup Reminder Sent': '',
+            'PickupReminderSent': ''
+        })
         
         # Create order lines DataFrame
         order_lines_df = order_data_df[[
             'OrderID', 'LineItem', 'Type', 'Size', 'Unit Price', 'CakeQty', 'Color', 'Writing Notes'
-        ]]
-        
-        # Add additional columns
-        order_lines_df['Category'] = 'Cake'
-        order_lines_df['Product Description'] = None
-        order_lines_df['Line Item Notes'] = None
-        order_lines_df['Flavor'] = None
-        order_lines_df['Addons'] = None
-        order_lines_df['Item Tax (Calculated)'] = None
+        ]].copy().assign(
+            Category='Cake',
+            **{col: None for col in (
+                'Product Description', 'Line Item Notes', 'Flavor', 'Addons', 'Item Tax (Calculated)'
+            )}
+        )
         
         # Data cleanup
         replacements = {
@@ -632,20 +858,16 @@ class ShopifyOrderSync:
             '4 Layer': '4L', '4 Layers': '4L',
             'OBAMA': 'Obama'
         }
-        for old, new in replacements.items():
-            order_lines_df['Size'] = order_lines_df['Size'].replace(old, new)
+        order_lines_df['Size'] = order_lines_df['Size'].replace(replacements)
         
-        # Add WEB prefix to OrderID if needed
-        if not order_df['OrderID'].astype(str).str.startswith('WEB').all():
-            order_df['OrderID'] = 'WEB' + order_df['OrderID'].astype(str)
-        if not order_lines_df['OrderID'].astype(str).str.startswith('WEB').all():
-            order_lines_df['OrderID'] = 'WEB' + order_lines_df['OrderID'].astype(str)
+        # Add WEB prefix to OrderID where missing
+        for df in (order_df, order_lines_df):
+            order_ids = df['OrderID'].astype(str)
+            df['OrderID'] = order_ids.where(order_ids.str.startswith('WEB'), 'WEB' + order_ids)
         
         # Convert line item numbers to letters
         line_item_map = {1: 'A', 2: 'B', 3: 'C', 4: 'D', 5: 'E', 6: 'F', 7: 'G'}
-        order_lines_df['LineItem'] = order_lines_df['LineItem'].apply(
-            lambda x: line_item_map.get(x, '*') if isinstance(x, (int, float)) else x
-        )
+        order_lines_df['LineItem'] = order_lines_df['LineItem'].map(line_item_map).fillna('*')
         
         # Update Product Description
         order_lines_df['Product Description'] = (
@@ -665,61 +887,68 @@ class ShopifyOrderSync:
             if not order_df.empty:
                 orders_file = f'test_output/orders_to_append_{timestamp}.csv'
                 Path('test_output').mkdir(exist_ok=True)
-                order_df.to_csv(orders_file, index=False)
+                _write_csv(order_df, orders_file)
                 logger.info(f"TEST MODE: Saved orders to CSV: {orders_file}")
             
             if not order_lines_df.empty:
                 lines_file = f'test_output/order_lines_to_append_{timestamp}.csv'
                 Path('test_output').mkdir(exist_ok=True)
-                order_lines_df.to_csv(lines_file, index=False)
+                _write_csv(order_lines_df, lines_file)
                 logger.info(f"TEST MODE: Saved order lines to CSV: {lines_file}")
             
             # Write to TEST worksheets in Google Sheets
             try:
-                target_sheet = self.google_client.open(self.config['target_spreadsheet'])
+                target_sheet = self.open_target_spreadsheet()
                 
-                # Create or get TEST Customer Orders worksheet
-                try:
-                    test_orders_worksheet = target_sheet.worksheet("TEST Customer Orders")
-                    logger.info("Found existing 'TEST Customer Orders' worksheet")
-                except:
-                    test_orders_worksheet = target_sheet.add_worksheet(title="TEST Customer Orders", rows=1000, cols=30)
-                    logger.info("Created new 'TEST Customer Orders' worksheet")
+                # Look up existing worksheets with a single metadata request;
+                # API errors propagate instead of creating duplicate worksheets
+                existing = {ws.title: ws for ws in target_sheet.worksheets()}
                 
-                # Create or get TEST - Bakery Products Ordered worksheet  
-                try:
-                    test_lines_worksheet = target_sheet.worksheet("TEST - Bakery Products Ordered")
-                    logger.info("Found existing 'TEST - Bakery Products Ordered' worksheet")
-                except:
-                    test_lines_worksheet = target_sheet.add_worksheet(title="TEST - Bakery Products Ordered", rows=1000, cols=30)
-                    logger.info("Created new 'TEST - Bakery Products Ordered' worksheet")
+                # Create any missing TEST worksheets in a single batch request
+                test_titles = ["TEST Customer Orders", "TEST - Bakery Products Ordered"]
+                missing_titles = [title for title in test_titles if title not in existing]
+                for title in test_titles:
+                    if title not in missing_titles:
+                        logger.info(f"Found existing '{title}' worksheet")
+                if missing_titles:
+                    response = target_sheet.batch_update({'requests': [
+                        {'addSheet': {'properties': {
+                            'title': title,
+                            'gridProperties': {'rowCount': 1000, 'columnCount': 30}
+                        }}}
+                        for title in missing_titles
+                    ]})
+                    for title, reply in zip(missing_titles, response['replies']):
+                        existing[title] = gspread.Worksheet(target_sheet, reply['addSheet']['properties'])
+                        logger.info(f"Created new '{title}' worksheet")
+                test_orders_worksheet = existing["TEST Customer Orders"]
+                test_lines_worksheet = existing["TEST - Bakery Products Ordered"]
+                
+                # Clear existing test data and write headers + new data for both
+                # worksheets in one batched clear and one batched update
+                writes = [
+                    (worksheet, df)
+                    for worksheet, df in ((test_orders_worksheet, order_df), (test_lines_worksheet, order_lines_df))
+                    if not df.empty
+                ]
+                if writes:
+                    target_sheet.values_batch_clear(body={'ranges': [
+                        absolute_range_name(worksheet.title) for worksheet, _ in writes
+                    ]})
+                    target_sheet.values_batch_update(body={
+                        'valueInputOption': 'USER_ENTERED',
+                        'data': [
+                            {
+                                'range': absolute_range_name(worksheet.title, 'A1'),
+                                'values': _df_to_values(df, header=True)
+                            }
+                            for worksheet, df in writes
+                        ]
+                    })
                 
                 if not order_df.empty:
-                    # Clear existing test data and write headers + new data
-                    test_orders_worksheet.clear()
-                    
-                    # Prepare data with headers
-                    order_df_filled = order_df.fillna('')
-                    headers = [order_df_filled.columns.tolist()]
-                    data_rows = order_df_filled.values.tolist()
-                    all_data = headers + data_rows
-                    
-                    # Write to sheet
-                    test_orders_worksheet.update('A1', all_data, value_input_option='USER_ENTERED')
                     logger.info(f"TEST MODE: Wrote {len(order_df)} orders to 'TEST Customer Orders' worksheet")
-                
                 if not order_lines_df.empty:
-                    # Clear existing test data and write headers + new data
-                    test_lines_worksheet.clear()
-                    
-                    # Prepare data with headers
-                    lines_df_filled = order_lines_df.fillna('')
-                    headers = [lines_df_filled.columns.tolist()]
-                    data_rows = lines_df_filled.values.tolist()
-                    all_data = headers + data_rows
-                    
-                    # Write to sheet
-                    test_lines_worksheet.update('A1', all_data, value_input_option='USER_ENTERED')
                     logger.info(f"TEST MODE: Wrote {len(order_lines_df)} order lines to 'TEST Bakery Products Ordered' worksheet")
                 
             except Exception as e:
@@ -750,14 +979,13 @@ class ShopifyOrderSync:
         
         # Normal mode - actually append to sheets
         try:
-            target_sheet = self.google_client.open(self.config['target_spreadsheet'])
+            target_sheet = self.open_target_spreadsheet()
             order_worksheet = target_sheet.worksheet("Customer Orders")
             order_lines_worksheet = target_sheet.worksheet("Bakery Products Ordered ")
             
             if not order_df.empty:
-                # Prepare data for appending
-                order_df = order_df.fillna('')
-                order_values = order_df.values.tolist()
+                # Prepare data for appending, blanking missing values
+                order_values = _df_to_values(order_df)
                 
                 # Append orders
                 order_worksheet.append_rows(order_values, table_range='A1', value_input_option='USER_ENTERED')
@@ -765,8 +993,7 @@ class ShopifyOrderSync:
             
             if not order_lines_df.empty:
                 # Prepare order lines
-                order_lines_df = order_lines_df.fillna('')
-                order_lines_values = order_lines_df.values.tolist()
+                order_lines_values = _df_to_values(order_lines_df)
                 
                 # Append order lines
                 order_lines_worksheet.append_rows(order_lines_values, table_range='A1', value_input_option='USER_ENTERED')
@@ -778,93 +1005,122 @@ class ShopifyOrderSync:
     
     def update_tracking_database(self, orders: List[dict], status: str = 'synced'):
         """Update tracking database with synced orders"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        rows = [
+            (str(order['id']), order.get('order_number'), order.get('created_at'), order.get('updated_at'),
+             *self._order_hashes(order), status)
+            for order in orders
+        ]
+        
+        # One write transaction for the whole batch
+        with self._conn:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.executemany(_SQL_INSERT_TRACKING, rows)
         
-        for order in orders:
-            order_id = str(order['id'])
-            order_number = order.get('order_number')
-            created_at = order.get('created_at')
-            updated_at = order.get('updated_at')
-            order_hash = self._calculate_order_hash(order)
-            line_items_hash = self._calculate_line_items_hash(order.get('line_items', []))
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO order_tracking 
-                (shopify_order_id, order_number, created_at, updated_at, order_hash, line_items_hash, sync_status)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (order_id, order_number, created_at, updated_at, order_hash, line_items_hash, status))
-        
-        conn.commit()
-        conn.close()
         logger.info(f"Updated tracking database for {len(orders)} orders")
     
     def log_sync_result(self, orders_processed: int, orders_new: int, orders_updated: int, status: str, error_message: str = None):
         """Log sync results to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO sync_history (orders_processed, orders_new, orders_updated, status, error_message)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (orders_processed, orders_new, orders_updated, status, error_message))
-        conn.commit()
-        conn.close()
+        with self._conn:
+            self._conn.execute(_SQL_INSERT_HISTORY, (orders_processed, orders_new, orders_updated, status, error_message))
+    
+    def get_order_number_range(self) -> Tuple[Optional[int], Optional[int], int]:
+        """(min, max, count) of synced order numbers; min/max are None when nothing is tracked"""
+        return self._conn.execute('''
+            SELECT MIN(order_number), MAX(order_number), COUNT(order_number)
+            FROM order_tracking
+            WHERE sync_status = 'synced'
+        ''').fetchone()
+    
+    def find_missing_order_numbers(self, limit: Optional[int] = None) -> List[int]:
+        """Order numbers absent between the lowest and highest synced order, ascending"""
+        # Walk the range inside SQLite so the numbers never materialise in Python
+        cursor = self._conn.execute('''
+            WITH RECURSIVE
+                bounds(lo, hi) AS (
+                    SELECT MIN(order_number), MAX(order_number)
+                    FROM order_tracking
+                    WHERE sync_status = 'synced'
+                ),
+                seq(n) AS (
+                    SELECT lo FROM bounds WHERE lo IS NOT NULL
+                    UNION ALL
+                    SELECT n + 1 FROM seq, bounds WHERE n < hi
+                )
+            SELECT n FROM seq
+            WHERE NOT EXISTS (
+                SELECT 1 FROM order_tracking
+                WHERE order_number = seq.n AND sync_status = 'synced'
+            )
+            LIMIT ?
+        ''', (-1 if limit is None else limit,))
+        return [row[0] for row in cursor]
     
     def reconcile_orders(self):
         """Reconcile orders between Shopify and tracking database"""
-        # Get all order numbers from tracking database
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT order_number FROM order_tracking WHERE sync_status = "synced" ORDER BY order_number')
-        tracked_numbers = [row[0] for row in cursor.fetchall() if row[0]]
-        conn.close()
-        
-        if not tracked_numbers:
+        min_num, _, _ = self.get_order_number_range()
+        if min_num is None:
             logger.info("No orders in tracking database to reconcile")
             return
         
         # Check for gaps
-        min_num = min(tracked_numbers)
-        max_num = max(tracked_numbers)
-        expected_numbers = set(range(min_num, max_num + 1))
-        tracked_set = set(tracked_numbers)
-        
-        missing_numbers = expected_numbers - tracked_set
+        missing_numbers = self.find_missing_order_numbers()
         
         if missing_numbers:
             logger.warning(f"Found {len(missing_numbers)} missing order numbers: {sorted(missing_numbers)[:10]}...")
             
-            # Attempt to fetch missing orders
-            for order_num in missing_numbers:
-                try:
-                    # Fetch specific order from Shopify
-                    url = f"https://{self.config['shopify_store_name']}.myshopify.com/admin/api/2023-04/orders.json"
-                    params = {'name': f"#{order_num}"}
-                    headers = {"X-Shopify-Access-Token": self.config['shopify_access_token']}
-                    
-                    response = self.session.get(url, headers=headers, params=params, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data.get('orders'):
-                            logger.info(f"Found missing order #{order_num}")
-                            # Process this order
-                            self._process_single_order(data['orders'][0])
-                except Exception as e:
-                    logger.error(f"Error fetching missing order #{order_num}: {e}")
+            # Attempt to fetch missing orders concurrently over the shared
+            # session; sheet appends and DB writes stay on this thread
+            order_nums = sorted(missing_numbers)
+            recovered = []
+            with ThreadPoolExecutor(max_workers=RECONCILE_FETCH_WORKERS) as executor:
+                futures = [executor.submit(self._fetch_order_by_number, order_num) for order_num in order_nums]
+                for order_num, future in zip(order_nums, futures):
+                    try:
+                        order = future.result()
+                    except Exception as e:
+                        logger.error(f"Error fetching missing order #{order_num}: {e}")
+                        continue
+                    if order:
+                        logger.info(f"Found missing order #{order_num}")
+                        recovered.append(order)
+            
+            # Append and track all recovered orders in one batch
+            if recovered:
+                self._process_orders(recovered)
         else:
             logger.info("No missing orders found during reconciliation")
     
-    def _process_single_order(self, order: dict):
-        """Process a single order"""
+    def _fetch_order_by_number(self, order_num: int) -> Optional[dict]:
+        """Fetch a specific order from Shopify by order number, or None if not found"""
+        url = f"https://{self.config['shopify_store_name']}.myshopify.com/admin/api/2023-04/orders.json"
+        params = {'name': f"#{order_num}"}
+        
+        response = self.session.get(url, params=params, timeout=10)
+        # The bucket refills at 2 calls/s; with every worker pausing
+        # workers/2 seconds, the pool as a whole stays at that rate
+        self._throttle(response, pause=RECONCILE_FETCH_WORKERS / 2)
+        if response.status_code == 200:
+            orders = json_loads(response.content).get('orders')
+            if orders:
+                return orders[0]
+        return None
+    
+    def _process_orders(self, orders: List[dict]):
+        """Append a batch of orders to sheets and record them as synced"""
+        # Orders without line items produce no rows and are left untracked
+        orders = [order for order in orders if order.get('line_items')]
+        if not orders:
+            return
         try:
-            order_df, order_lines_df = self.transform_orders_for_sheets([order])
-            if not order_df.empty:
-                self.append_to_sheets(order_df, order_lines_df)
-                self.update_tracking_database([order])
-                logger.info(f"Successfully processed order #{order.get('order_number')}")
+            order_df, order_lines_df = self.transform_orders_for_sheets(orders)
+            self.append_to_sheets(order_df, order_lines_df)
+            self.update_tracking_database(orders)
+            order_numbers = ', '.join(f"#{order.get('order_number')}" for order in orders)
+            logger.info(f"Successfully processed orders {order_numbers}")
         except Exception as e:
-            logger.error(f"Error processing order #{order.get('order_number')}: {e}")
-            self._log_sync_error(str(order.get('id')), 'processing', str(e))
+            logger.error(f"Error processing orders: {e}")
+            for order in orders:
+                self._log_sync_error(str(order.get('id')), 'processing', str(e))
     
     def run_sync(self, test_mode: bool = False):
         """Main sync method"""
@@ -935,11 +1191,13 @@ class ShopifyOrderSync:
             logger.error(f"Sync failed: {e}")
             self.log_sync_result(0, 0, 0, 'failed', str(e))
             raise
+        finally:
+            self._flush_errors()
     
     def get_sync_status(self) -> dict:
         """Get current sync status and statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        self._flush_errors()
+        cursor = self._conn.cursor()
         
         # Get last sync info
         cursor.execute('''
@@ -958,8 +1216,6 @@ class ShopifyOrderSync:
         cursor.execute('SELECT COUNT(*) FROM sync_errors WHERE resolved = FALSE')
         pending_errors = cursor.fetchone()[0]
         
-        conn.close()
-        
         return {
             'last_sync': last_sync,
             'total_tracked': total_tracked,
@@ -967,12 +1223,13 @@ class ShopifyOrderSync:
         }
 
 
-def main():
+def main(test_mode: Optional[bool] = None):
     """Main entry point for the sync script"""
     import sys
     
-    # Check for test mode flag
-    test_mode = '--test' in sys.argv or '-t' in sys.argv
+    # Check for test mode flag unless the caller decided already
+    if test_mode is None:
+        test_mode = '--test' in sys.argv or '-t' in sys.argv
     
     # Create sync instance
     sync = ShopifyOrderSync()
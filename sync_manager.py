@@ -6,7 +6,7 @@ Provides commands for status checking, manual sync, and troubleshooting
 """
 
 import argparse
-import sqlite3
+import csv
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -20,12 +20,23 @@ load_dotenv()
 from shopify_sheets_sync import ShopifyOrderSync
 
 
+def _format_table(description, rows):
+    """Right-aligned plain-text table of cursor rows, headed by column names"""
+    columns = [column[0] for column in description]
+    cells = [[str(value) for value in row] for row in rows]
+    widths = [max([len(column)] + [len(row[i]) for row in cells]) for i, column in enumerate(columns)]
+    lines = [columns] + cells
+    return '\n'.join(' '.join(cell.rjust(width) for cell, width in zip(line, widths)) for line in lines)
+
+
 class SyncManager:
     """Manager class for sync operations and diagnostics"""
     
     def __init__(self, config_file='config.json'):
         self.sync = ShopifyOrderSync(config_file)
         self.db_path = self.sync.db_path
+        # Reuse the sync's tracking connection; it is closed at exit
+        self._conn = self.sync._conn
     
     def show_status(self):
         """Display current sync status"""
@@ -49,26 +60,23 @@ class SyncManager:
     
     def show_recent_orders(self, limit=10):
         """Show recently synced orders"""
-        conn = sqlite3.connect(self.db_path)
         query = '''
             SELECT order_number, created_at, sync_timestamp
             FROM order_tracking
             ORDER BY sync_timestamp DESC
             LIMIT ?
         '''
-        df = pd.read_sql_query(query, conn, params=[limit])
-        conn.close()
+        cursor = self._conn.execute(query, (limit,))
+        rows = cursor.fetchall()
         
         print(f"\n=== Recent {limit} Orders ===")
-        if not df.empty:
-            print(df.to_string(index=False))
+        if rows:
+            print(_format_table(cursor.description, rows))
         else:
             print("No orders found")
     
     def show_errors(self, unresolved_only=True):
         """Display sync errors"""
-        conn = sqlite3.connect(self.db_path)
-        
         query = '''
             SELECT error_timestamp, order_id, error_type, error_message, retry_count
             FROM sync_errors
@@ -79,66 +87,50 @@ class SyncManager:
         
         query += ' ORDER BY error_timestamp DESC'
         
-        df = pd.read_sql_query(query, conn)
-        conn.close()
+        cursor = self._conn.execute(query)
+        rows = cursor.fetchall()
         
         print("\n=== Sync Errors ===")
-        if not df.empty:
-            print(df.to_string(index=False))
+        if rows:
+            print(_format_table(cursor.description, rows))
         else:
             print("No errors found")
     
     def check_missing_orders(self):
         """Check for gaps in order numbers"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT order_number 
-            FROM order_tracking 
-            WHERE sync_status = "synced" AND order_number IS NOT NULL
-            ORDER BY order_number
-        ''')
-        
-        order_numbers = [row[0] for row in cursor.fetchall()]
-        conn.close()
+        min_num, max_num, synced_count = self.sync.get_order_number_range()
         
-        if not order_numbers:
+        if min_num is None:
             print("No orders in database")
             return
         
-        min_num = min(order_numbers)
-        max_num = max(order_numbers)
-        expected = set(range(min_num, max_num + 1))
-        actual = set(order_numbers)
-        missing = sorted(expected - actual)
+        expected_count = max_num - min_num + 1
+        missing_count = expected_count - synced_count
         
         print(f"\n=== Order Number Analysis ===")
         print(f"Range: {min_num} - {max_num}")
-        print(f"Total expected: {len(expected)}")
-        print(f"Total synced: {len(actual)}")
+        print(f"Total expected: {expected_count}")
+        print(f"Total synced: {synced_count}")
         
-        if missing:
-            print(f"Missing {len(missing)} orders:")
+        if missing_count:
+            print(f"Missing {missing_count} orders:")
             # Show first 20 missing orders
-            for num in missing[:20]:
+            for num in self.sync.find_missing_order_numbers(limit=20):
                 print(f"  - Order #{num}")
-            if len(missing) > 20:
-                print(f"  ... and {len(missing) - 20} more")
+            if missing_count > 20:
+                print(f"  ... and {missing_count - 20} more")
         else:
             print("No gaps found in order numbers")
     
     def reset_order_status(self, order_number):
         """Reset sync status for a specific order"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            DELETE FROM order_tracking 
-            WHERE order_number = ?
-        ''', (order_number,))
+        with self._conn:
+            cursor = self._conn.execute('''
+                DELETE FROM order_tracking 
+                WHERE order_number = ?
+            ''', (order_number,))
         
         affected = cursor.rowcount
-        conn.commit()
-        conn.close()
         
         if affected:
             print(f"Reset status for order #{order_number}")
@@ -147,13 +139,18 @@ class SyncManager:
     
     def export_tracking_data(self, output_file='tracking_export.csv'):
         """Export tracking database to CSV"""
-        conn = sqlite3.connect(self.db_path)
-        query = 'SELECT * FROM order_tracking ORDER BY order_number'
-        df = pd.read_sql_query(query, conn)
-        conn.close()
+        cursor = self._conn.execute('SELECT * FROM order_tracking ORDER BY order_number')
         
-        df.to_csv(output_file, index=False)
-        print(f"Exported {len(df)} orders to {output_file}")
+        # Stream rows straight to the file instead of building a DataFrame
+        exported = 0
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow([column[0] for column in cursor.description])
+            for rows in iter(lambda: cursor.fetchmany(10000), []):
+                writer.writerows(rows)
+                exported += len(rows)
+        
+        print(f"Exported {exported} orders to {output_file}")
     
     def validate_sheets_connection(self):
         """Test connection to Google Sheets"""
@@ -179,17 +176,22 @@ class SyncManager:
             print("✗ Shopify API connection failed:")
             print(f"  {e}")
     
+    def _recent_sync_exists(self):
+        """Whether a sync was logged in the last 5 minutes"""
+        # sync_timestamp is stored in UTC, as is datetime('now')
+        return self._conn.execute('''
+            SELECT 1 FROM sync_history
+            WHERE sync_timestamp > datetime('now', '-5 minutes')
+            LIMIT 1
+        ''').fetchone() is not None
+    
     def run_sync(self, force=False, test_mode=False):
         """Run the sync process"""
         if not force:
             # Check if sync was run recently
-            status = self.sync.get_sync_status()
-            if status['last_sync']:
-                last_sync_time = datetime.fromisoformat(status['last_sync'][0])
-                time_since = datetime.now() - last_sync_time
-                if time_since.total_seconds() < 300:  # 5 minutes
-                    print("Sync was run recently. Use --force to override.")
-                    return
+            if self._recent_sync_exists():
+                print("Sync was run recently. Use --force to override.")
+                return
         
         mode_str = "TEST MODE" if test_mode else "PRODUCTION MODE"
         print(f"Starting sync process in {mode_str}...")
@@ -202,15 +204,13 @@ class SyncManager:
         if not end_date:
             end_date = datetime.now()
         
-        conn = sqlite3.connect(self.db_path)
-        
         # Get sync history
         sync_query = '''
             SELECT * FROM sync_history
             WHERE sync_timestamp BETWEEN ? AND ?
             ORDER BY sync_timestamp
         '''
-        sync_df = pd.read_sql_query(sync_query, conn, params=[
+        sync_df = pd.read_sql_query(sync_query, self._conn, params=[
             start_date.isoformat(), end_date.isoformat()
         ])
         
@@ -221,12 +221,10 @@ class SyncManager:
             WHERE sync_timestamp BETWEEN ? AND ?
             GROUP BY DATE(sync_timestamp)
         '''
-        order_df = pd.read_sql_query(order_query, conn, params=[
+        order_df = pd.read_sql_query(order_query, self._conn, params=[
             start_date.isoformat(), end_date.isoformat()
         ])
         
-        conn.close()
-        
         print(f"\n=== Sync Report: {start_date.date()} to {end_date.date()} ===")
         
         if not sync_df.empty:
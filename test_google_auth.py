@@ -4,12 +4,12 @@
 Simple test script to diagnose Google Sheets authentication issues
 """
 
-import gspread
-from google.oauth2 import service_account
-import json
 from datetime import datetime
 import time
 
+from config_cache import load_config, load_service_account_info
+from sheets_client import load_credentials, gspread_client, open_target_spreadsheet
+
 def test_google_auth():
     print("=== Google Sheets Authentication Test ===")
     print(f"System time: {datetime.now()}")
@@ -17,33 +17,24 @@ def test_google_auth():
     
     try:
         # Load config
-        with open('config.json', 'r') as f:
-            config = json.load(f)
+        config = load_config()
         
         print(f"Service account file: {config['google_service_account_file']}")
         print(f"Target spreadsheet: {config['target_spreadsheet']}")
         
         # Setup credentials
-        SCOPES = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
         print("Creating credentials...")
-        credentials = service_account.Credentials.from_service_account_file(
-            config['google_service_account_file'], 
-            scopes=SCOPES
-        )
+        load_credentials()
         print("✓ Credentials created successfully")
         
         print("Authorizing gspread client...")
-        client = gspread.authorize(credentials)
+        gspread_client()
         print("✓ Client authorized successfully")
         
         print("Testing spreadsheet access...")
         try:
             # Try to open the spreadsheet
-            spreadsheet = client.open(config['target_spreadsheet'])
+            spreadsheet = open_target_spreadsheet()
             print(f"✓ Successfully opened spreadsheet: {spreadsheet.title}")
             
             # Try to list worksheets
@@ -80,12 +71,11 @@ def test_google_auth():
             
             # Check if the service account email is in the right format
             try:
-                with open(config['google_service_account_file'], 'r') as f:
-                    sa_data = json.load(f)
-                    email = sa_data.get('client_email', '')
-                    if email:
-                        print(f"4. Service account email: {email}")
-                        print("   Make sure this email has been granted access to the spreadsheet")
+                sa_data = load_service_account_info()
+                email = sa_data.get('client_email', '')
+                if email:
+                    print(f"4. Service account email: {email}")
+                    print("   Make sure this email has been granted access to the spreadsheet")
             except:
                 pass
 
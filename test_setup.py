@@ -7,29 +7,64 @@ Run this before the full sync to ensure everything is configured correctly
 
 import sys
 import os
-from pathlib import Path
-import json
+import argparse
+import io
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
-def test_imports():
-    """Test if all required packages are installed"""
+_REQUIRED_FIELDS = ('shopify_access_token', 'google_service_account_file')
+# Placeholders like YOUR_SHOPIFY_ACCESS_TOKEN_HERE from config_template.json
+_SENTINELS = frozenset(f"YOUR_{field.upper()}_HERE" for field in _REQUIRED_FIELDS)
+
+_REQUIRED_PACKAGES = (
+    ('gspread', 'gspread'),
+    ('requests', 'requests'),
+    ('pandas', 'pandas'),
+    ('numpy', 'numpy'),
+    ('google.oauth2', 'google-auth'),
+    ('gspread_pandas', 'gspread-pandas'),
+    ('dotenv', 'python-dotenv')
+)
+
+def _is_installed(module_name):
+    """Locate a module without running any of its code"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ImportError:
+        return False
+
+def test_imports(deep=False):
+    """Test if all required packages are installed
+    
+    By default each package is only located; deep=True imports them, which
+    also catches installs that are present but fail at import time.
+    """
     print("Testing required imports...")
-    required_packages = [
-        ('gspread', 'gspread'),
-        ('requests', 'requests'),
-        ('pandas', 'pandas'),
-        ('numpy', 'numpy'),
-        ('google.oauth2', 'google-auth'),
-        ('gspread_pandas', 'gspread-pandas'),
-        ('dotenv', 'python-dotenv')
-    ]
+    required_packages = _REQUIRED_PACKAGES
+    module_names = [module_name for module_name, _ in required_packages]
+    
+    if deep:
+        def probe(module_name):
+            try:
+                importlib.import_module(module_name)
+                return True
+            except ImportError:
+                return False
+        
+        # Import concurrently so slow packages overlap; report in the listed order
+        with ThreadPoolExecutor(max_workers=len(required_packages)) as executor:
+            results = list(executor.map(probe, module_names))
+    else:
+        results = [_is_installed(module_name) for module_name in module_names]
     
     all_good = True
-    for module_name, package_name in required_packages:
-        try:
-            __import__(module_name)
-            print(f"✓ {module_name} imported successfully")
-        except ImportError:
-            print(f"✗ Failed to import {module_name}. Install with: pip install {package_name}")
+    for (module_name, package_name), ok in zip(required_packages, results):
+        if ok:
+            print(f"✓ {module_name} {'imported successfully' if deep else 'is installed'}")
+        else:
+            print(f"✗ {'Failed to import' if deep else 'Could not find'} {module_name}. Install with: pip install {package_name}")
             all_good = False
     
     return all_good
@@ -39,8 +74,8 @@ def test_config():
     print("\nTesting configuration...")
     
     # Check for config file
-    config_exists = Path('config.json').exists()
-    env_exists = Path('.env').exists()
+    config_exists = os.path.isfile('config.json')
+    env_exists = os.path.isfile('.env')
     
     if not config_exists and not env_exists:
         print("✗ No configuration found. Create either config.json or .env file")
@@ -49,20 +84,23 @@ def test_config():
     if config_exists:
         print("✓ Found config.json")
         try:
-            with open('config.json', 'r') as f:
-                config = json.load(f)
+            # Shared with ShopifyOrderSync below, so the file is parsed once
+            from config_cache import load_config
+            config = load_config('config.json')
                 
-            # Check required fields
-            required_fields = ['shopify_access_token', 'google_service_account_file']
-            for field in required_fields:
-                if field in config and config[field] and config[field] != f"YOUR_{field.upper()}_HERE":
-                    print(f"✓ {field} is configured")
-                else:
+            # Check required fields, reporting every misconfigured one at once
+            bad_fields = [field for field in _REQUIRED_FIELDS
+                          if not config.get(field) or config[field] in _SENTINELS]
+            for field in _REQUIRED_FIELDS:
+                if field in bad_fields:
                     print(f"✗ {field} is not configured properly")
-                    return False
+                else:
+                    print(f"✓ {field} is configured")
+            if bad_fields:
+                return False
                     
             # Check if Google service account file exists
-            if Path(config['google_service_account_file']).exists():
+            if os.path.isfile(config['google_service_account_file']):
                 print("✓ Google service account file exists")
             else:
                 print(f"✗ Google service account file not found: {config['google_service_account_file']}")
@@ -90,20 +128,29 @@ def test_config():
     
     return True
 
+_sync = None
+_sync_lock = threading.Lock()
+
+def _get_sync():
+    """ShopifyOrderSync shared by the network tests, created on first use"""
+    global _sync
+    with _sync_lock:
+        if _sync is None:
+            from shopify_sheets_sync import ShopifyOrderSync
+            _sync = ShopifyOrderSync()
+        return _sync
+
 def test_shopify_connection():
     """Test basic Shopify API connection"""
     print("\nTesting Shopify API connection...")
     
     try:
-        from shopify_sheets_sync import ShopifyOrderSync
-        sync = ShopifyOrderSync()
+        sync = _get_sync()
         
-        # Try to fetch store info
-        import requests
+        # Try to fetch store info over the sync's pooled, authenticated session
         url = f"https://{sync.config['shopify_store_name']}.myshopify.com/admin/api/2023-04/shop.json"
-        headers = {"X-Shopify-Access-Token": sync.config['shopify_access_token']}
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = sync.session.get(url, timeout=10)
         
         if response.status_code == 200:
             shop_data = response.json()
@@ -122,29 +169,43 @@ def test_google_connection():
     print("\nTesting Google Sheets connection...")
     
     try:
-        from shopify_sheets_sync import ShopifyOrderSync
-        sync = ShopifyOrderSync()
+        sync = _get_sync()
         sync.setup_google_auth()
         
-        # Try to list spreadsheets
-        spreadsheets = sync.google_client.openall()
-        print(f"✓ Connected to Google Sheets. Found {len(spreadsheets)} spreadsheets")
-        
-        # Check if target spreadsheet exists
+        # Open the target the same way the sync does (by key when configured,
+        # otherwise by title); only list other spreadsheets if that fails
+        import gspread
         target_name = sync.config['target_spreadsheet']
-        found = False
-        for sheet in spreadsheets:
-            if sheet.title == target_name:
-                found = True
-                break
+        target_id = sync.config.get('target_spreadsheet_id')
+        try:
+            spreadsheet = sync.open_target_spreadsheet()
+            title = spreadsheet.title
+        except gspread.SpreadsheetNotFound:
+            title = None
+        found = title == target_name
+        print("✓ Connected to Google Sheets")
                 
         if found:
             print(f"✓ Target spreadsheet '{target_name}' found")
+            if not target_id:
+                print(f"  Tip: set \"target_spreadsheet_id\": \"{spreadsheet.id}\" in config.json to open it directly")
+        elif target_id and title:
+            print(f"✗ Spreadsheet {target_id} is '{title}', expected '{target_name}'")
         else:
             print(f"✗ Target spreadsheet '{target_name}' not found")
             print("  Available spreadsheets:")
-            for sheet in spreadsheets[:5]:
-                print(f"    - {sheet.title}")
+            # A single small page is enough for the hint
+            from gspread.urls import DRIVE_FILES_API_V3_URL
+            from gspread.utils import MimeType
+            response = sync.google_client.request("get", DRIVE_FILES_API_V3_URL, params={
+                "q": f'mimeType="{MimeType.google_sheets}"',
+                "pageSize": 5,
+                "supportsAllDrives": True,
+                "includeItemsFromAllDrives": True,
+                "fields": "files(name)"
+            })
+            for file in response.json()['files']:
+                print(f"    - {file['name']}")
                 
         return found
         
@@ -152,30 +213,99 @@ def test_google_connection():
         print(f"✗ Error testing Google Sheets connection: {e}")
         return False
 
+class _ThreadLocalStdout:
+    """sys.stdout stand-in that gives capturing threads their own buffer"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+    
+    def write(self, text):
+        return getattr(self._local, 'buffer', self.stream).write(text)
+    
+    def flush(self):
+        getattr(self._local, 'buffer', self.stream).flush()
+    
+    def __getattr__(self, name):
+        # encoding, isatty(), fileno() etc. come from the real stream
+        return getattr(self.stream, name)
+    
+    def capture(self, func, *args):
+        """Run func(*args) in this thread, returning (result, printed output)"""
+        self._local.buffer = io.StringIO()
+        try:
+            return func(*args), self._local.buffer.getvalue()
+        finally:
+            del self._local.buffer
+
+def _run_test(test_name, test_func):
+    """Run one test, treating an unexpected exception as a failure"""
+    try:
+        return test_func()
+    except Exception as e:
+        print(f"✗ Error running {test_name}: {e}")
+        return False
+
+# Checks by --only name; the heavy sync/Google imports happen inside each test
+LOCAL_TESTS = {
+    'imports': ("Package imports", test_imports),
+    'config': ("Configuration", test_config)
+}
+# Independent network round trips, run side by side
+NETWORK_TESTS = {
+    'shopify': ("Shopify API", test_shopify_connection),
+    'google': ("Google Sheets", test_google_connection)
+}
+
 def main():
     """Run all tests"""
+    parser = argparse.ArgumentParser(description='Verify the Shopify sync setup')
+    parser.add_argument('--only', nargs='+', choices=[*LOCAL_TESTS, *NETWORK_TESTS],
+                        help='Run only the named checks')
+    parser.add_argument('--deep', action='store_true',
+                        help='Import each required package instead of only locating it')
+    args = parser.parse_args()
+    if args.deep:
+        LOCAL_TESTS['imports'] = ("Package imports", partial(test_imports, deep=True))
+    selected = args.only or [*LOCAL_TESTS, *NETWORK_TESTS]
+    
     print("=== Shopify Sync Setup Test ===\n")
     
-    tests = [
-        ("Package imports", test_imports),
-        ("Configuration", test_config),
-        ("Shopify API", test_shopify_connection),
-        ("Google Sheets", test_google_connection)
-    ]
+    tests = [test for key, test in LOCAL_TESTS.items() if key in selected]
+    network_tests = [test for key, test in NETWORK_TESTS.items() if key in selected]
     
+    # Each test's output is buffered and written in one piece
     results = []
-    for test_name, test_func in tests:
-        try:
-            result = test_func()
+    stdout = sys.stdout = _ThreadLocalStdout(sys.stdout)
+    try:
+        for test_name, test_func in tests:
+            result, output = stdout.capture(_run_test, test_name, test_func)
+            stdout.stream.write(output)
             results.append((test_name, result))
-        except Exception as e:
-            print(f"✗ Error running {test_name}: {e}")
-            results.append((test_name, False))
+        
+        # The network probes need a usable config; don't wait on their timeouts
+        if ("Configuration", False) in results and network_tests:
+            stdout.stream.write("\nSkipping network tests until the configuration is fixed\n")
+            results += [(test_name, None) for test_name, _ in network_tests]
+            network_tests = []
+        
+        with ThreadPoolExecutor(max_workers=max(len(network_tests), 1)) as executor:
+            futures = [
+                executor.submit(stdout.capture, _run_test, test_name, test_func)
+                for test_name, test_func in network_tests
+            ]
+            # Print network test output in order, as if run serially
+            for (test_name, _), future in zip(network_tests, futures):
+                result, output = future.result()
+                stdout.stream.write(output)
+                results.append((test_name, result))
+    finally:
+        sys.stdout = stdout.stream
     
     print("\n=== Test Summary ===")
     all_passed = True
     for test_name, result in results:
-        status = "✓ PASS" if result else "✗ FAIL"
+        status = "- SKIP" if result is None else "✓ PASS" if result else "✗ FAIL"
         print(f"{test_name}: {status}")
         if not result:
             all_passed = False
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Tests for ShopifyOrderSync.fetch_shopify_orders error handling
+Run with: python -m unittest discover tests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shopify_sheets_sync import ShopifyOrderSync
+
+
+def _response(body: bytes, next_url: str = None) -> requests.Response:
+    """A 200 response with the given body and optional Link: rel=next"""
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response.headers['X-Shopify-Shop-Api-Call-Limit'] = '1/40'
+    if next_url:
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
+
+
+class FetchShopifyOrdersTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        config_file = os.path.join(self.tmp.name, 'config.json')
+        with open(config_file, 'w') as f:
+            json.dump({
+                'shopify_access_token': 'token',
+                'google_service_account_file': 'key.json',
+                'db_path': os.path.join(self.tmp.name, 'sync.db')
+            }, f)
+        self.sync = ShopifyOrderSync(config_file)
+
+    def tearDown(self):
+        self.sync.close()
+        self.tmp.cleanup()
+
+    def test_malformed_page_returns_partial_results(self):
+        pages = [
+            _response(b'{"orders": [{"id": 1}, {"id": 2}]}', next_url='https://example.com/next'),
+            _response(b'<html>Bad gateway</html>')
+        ]
+        with mock.patch.object(self.sync.session, 'get', side_effect=pages):
+            orders = self.sync.fetch_shopify_orders(since_date=datetime(2024, 1, 1))
+
+        self.assertEqual([order['id'] for order in orders], [1, 2])
+        self.assertEqual([error[2] for error in self.sync._error_buffer], ['api_fetch'])
+
+    def test_malformed_first_page_raises(self):
+        with mock.patch.object(self.sync.session, 'get', return_value=_response(b'not json')):
+            with self.assertRaises(ValueError):
+                self.sync.fetch_shopify_orders(since_date=datetime(2024, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()